@@ -57,6 +57,10 @@ class RequestFailedError(ProxyScrapeBaseException):
     """Request Failed Error."""
 
 
+class RequestNotModifiedError(ProxyScrapeBaseException):
+    """Request Not Modified Error."""
+
+
 class ResourceAlreadyDefinedError(ProxyScrapeBaseException):
     """Resource Already Defined Error."""
 
@@ -103,16 +103,12 @@ def get_proxyscrape_resource(proxytype='all', timeout=10000, ssl='all', anonymit
         response = request_proxy_list(url)
 
         try:
-            proxies = set()
             code = None if country == 'all' else country
             anonymous = anonymity in {'elite', 'anonymous'}
             type = None if 'all' else proxytype
 
-            for line in response.text.split():
-                host, port = line.split(':')
-                proxies.add(Proxy(host, port, code, None, anonymous, type, name))
-
-            return proxies
+            rows = (line.split(':') for line in response.text.split())
+            return frozenset(Proxy(host, port, code, None, anonymous, type, name) for host, port in rows)
         except (AttributeError, ValueError):
             raise InvalidHTMLError()
 
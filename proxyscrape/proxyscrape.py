@@ -32,7 +32,7 @@ from .errors import (
     InvalidResourceError,
     InvalidResourceTypeError
 )
-from .scrapers import RESOURCE_MAP, RESOURCE_TYPE_MAP, ProxyResource
+from .scrapers import RESOURCE_MAP, RESOURCE_TYPE_MAP, ProxyResource, refresh_all
 from .stores import Store, FILTER_OPTIONS
 from .shared import is_iterable
 
@@ -185,11 +185,14 @@ class Collector:
             return {resources, }
 
     def _refresh_resources(self, force):
-        for resource in self._resource_map.values():
-            refreshed, proxies = resource['proxy-resource'].refresh(force)
+        resources = list(self._resource_map.values())
 
+        # Update the store as results are collected, so they're kept even if another resource raises
+        def update_store(index, refreshed, proxies):
             if refreshed:
-                self._store.update_store(resource['id'], proxies)
+                self._store.update_store(resources[index]['id'], proxies)
+
+        refresh_all([resource['proxy-resource'] for resource in resources], force, callback=update_store)
 
     def _validate_filter_opts(self, filter_opts):
         if not filter_opts:
@@ -373,7 +376,8 @@ class Collector:
         """Refreshes the proxies.
 
         This is used to refresh the proxies without retrieving one from the internal store. Defaults to forcing a
-        refresh regardless of the last refresh performed.
+        refresh regardless of the last refresh performed. Resources that are already being refreshed by another thread
+        are skipped, even when forced, as that refresh will update the store.
 
         :param force:
             Whether to force a refresh. If True, a refresh is always performed; otherwise it is only done if a refresh
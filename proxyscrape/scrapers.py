@@ -20,31 +20,90 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-__all__ = ['add_resource', 'add_resource_type', 'get_resources', 'get_resource_types', 'ProxyResource', 'RESOURCE_MAP',
-           'RESOURCE_TYPE_MAP']
+__all__ = ['add_resource', 'add_resource_type', 'get_resources', 'get_resource_types', 'refresh_all', 'ProxyResource',
+           'RESOURCE_MAP', 'RESOURCE_TO_TYPES_MAP', 'RESOURCE_TYPE_MAP']
 
 
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from operator import itemgetter
+import requests
 from threading import Lock
-import time
+from urllib3.exceptions import HTTPError as TransportError
 
 from .errors import (
     InvalidHTMLError,
     InvalidResourceError,
     InvalidResourceTypeError,
+    RequestNotModifiedError,
     RequestNotOKError,
     RequestFailedError,
     ResourceAlreadyDefinedError,
     ResourceTypeAlreadyDefinedError
 )
 from .shared import (
+    conditional_requests,
     is_iterable,
     Proxy,
     request_proxy_list
 )
+
+try:
+    # RE2 matches in linear time; fall back to the standard library if it isn't installed
+    import re2 as _re
+except ImportError:
+    import re as _re
+
+try:
+    from time import monotonic as _monotonic
+except ImportError:  # Python 2
+    from time import time as _monotonic
+
 _resource_lock = Lock()
 _resource_type_lock = Lock()
 
+# A bytes pattern, so the character classes are ASCII-only and the body never needs decoding
+_IP_PORT_RE = _re.compile(br'[0-9]{1,3}(?:\.[0-9]{1,3}){3}:[0-9]{1,5}')
+_PROXY_DAILY_HEADINGS = (b'Free Http/Https Proxy List', b'Free Socks4 Proxy List', b'Free Socks5 Proxy List')
+
+_ANONYMOUS_LABELS = frozenset({'anonymous', 'elite proxy'})
+
+# Codes, countries and types repeat across rows and scrapes, so only a single copy of each is kept
+_STRING_CACHE = {}
+
+
+def _intern(string, _setdefault=_STRING_CACHE.setdefault):
+    return _setdefault(string, string)
+
+
+# Cells read from each table row: host, port, code, country, anonymity, and the column the proxy type derives from
+_HTTP_TABLE_COLUMNS = itemgetter(0, 1, 2, 3, 4, 6)
+_SOCKS_TABLE_COLUMNS = itemgetter(0, 1, 2, 3, 5, 4)
+_SSL_TABLE_COLUMNS = itemgetter(0, 1, 2, 3, 4, 4)  # Always https, so the type column is never read
+
+
+def _get_http_type(https):
+    return 'https' if https.lower() == 'yes' else 'http'
+
+
+def _get_socks_type(version):
+    return _intern(version.lower())
+
+
+def _get_ssl_type(https):
+    return 'https'
+
+
+# Column layout of each proxy table and how the proxy type is derived from it
+_TABLE_SPECS = {
+    'anonymous-proxy': {'columns': _HTTP_TABLE_COLUMNS, 'type': _get_http_type},
+    'free-proxy-list': {'columns': _HTTP_TABLE_COLUMNS, 'type': _get_http_type},
+    'socks-proxy': {'columns': _SOCKS_TABLE_COLUMNS, 'type': _get_socks_type},
+    'ssl-proxy': {'columns': _SSL_TABLE_COLUMNS, 'type': _get_ssl_type},
+    'uk-proxy': {'columns': _HTTP_TABLE_COLUMNS, 'type': _get_http_type},
+    'us-proxy': {'columns': _HTTP_TABLE_COLUMNS, 'type': _get_http_type}
+}
+
 
 class ProxyResource:
     """A manager for a single proxy resource.
@@ -60,12 +119,31 @@ class ProxyResource:
         self._func = func
         self._refresh_interval = refresh_interval
         self._lock = Lock()
-        self._last_refresh_time = 0
+        self._last_refresh_time = None
+        # Conditional request headers and the proxies they correspond to, from the last successful refresh
+        self._validators = {}
+        self._proxies = None
+
+    def is_expired(self, now=None):
+        """Returns whether the proxies are due for a refresh.
+
+        :param now:
+            (optional) The current monotonic time, if already known.
+        :type now: float or None
+        :return:
+            True if the resource has never been refreshed or its `refresh_interval` has elapsed; otherwise False.
+        :rtype: bool
+        """
+        if now is None:
+            now = _monotonic()
+        return self._last_refresh_time is None or self._last_refresh_time + self._refresh_interval <= now
 
     def refresh(self, force=False):
         """Refreshes proxies.
 
         Proxies are refreshed if they haven't been refreshed within the past `refresh_interval`, or if `force` is True.
+        If another thread is already refreshing the resource, this returns immediately without refreshing. Requests are
+        made conditional on the previous response, and the previous proxies are returned if the site is unchanged.
 
       :param force:
             Whether to force a refresh. If True, a refresh is always performed; otherwise it is only done if a refresh
@@ -74,87 +152,182 @@ class ProxyResource:
             A tuple denoting whether proxies were refreshed and the proxies retrieved.
         :rtype: (bool, iterable)
         """
-        if not force and self._last_refresh_time + self._refresh_interval > time.time():
+        now = _monotonic()
+        if not force and not self.is_expired(now):
+            return False, None
+
+        # Coalesce concurrent refreshes rather than queueing them up behind the one in progress
+        if not self._lock.acquire(False):
             return False, None
 
-        with self._lock:
+        try:
             # Check if updated before
-            if force or self._last_refresh_time + self._refresh_interval <= time.time():
+            if force or self.is_expired(now):
 
                 try:
-                    proxies = self._func()
-                    self._last_refresh_time = time.time()
+                    # Only keep the new validators if the proxies were retrieved successfully
+                    validators = dict(self._validators)
+                    with conditional_requests(validators):
+                        proxies = self._func()
+
+                    self._validators = validators
+                    self._proxies = proxies
+                    self._last_refresh_time = _monotonic()
                     return True, proxies
+                except RequestNotModifiedError:
+                    self._last_refresh_time = _monotonic()
+                    return True, self._proxies
                 except (InvalidHTMLError, RequestNotOKError, RequestFailedError):
                     pass
+        finally:
+            self._lock.release()
 
         return False, None
 
 
-def get_anonymous_proxies():
-    url = 'https://free-proxy-list.net/anonymous-proxy.html'
-    response = request_proxy_list(url)
+def refresh_all(resources, force=False, max_workers=8, callback=None):
+    """Refreshes multiple proxy resources concurrently.
+
+    Each resource is refreshed on a separate worker thread, so the requests to the different sites overlap. Threads are
+    only started for resources that are expired or when `force` is True. A resource that is already being refreshed by
+    another thread is not refreshed again, even if `force` is True, and is reported as not refreshed.
+
+    :param resources:
+        The proxy resources to refresh.
+    :param force:
+        Whether to force a refresh of each resource. Defaults to False.
+    :param max_workers:
+        The maximum number of resources to refresh at once. Defaults to 8.
+    :param callback:
+        (optional) Called as `callback(index, refreshed, proxies)` for each resource that was refreshed without raising,
+        where `index` is its position in `resources`.
+    :type resources: iterable
+    :type force: bool
+    :type max_workers: int
+    :type callback: function or None
+    :return:
+        The result of refreshing each resource, in the same order as `resources`.
+    :rtype: list
+    :raises Exception:
+        The first exception raised by a resource's refresh, once the results of the other resources have been passed to
+        `callback`.
+    """
+    resources = list(resources)
+    results = [(False, None)] * len(resources)
+
+    now = _monotonic()
+    pending = [i for i, resource in enumerate(resources) if force or resource.is_expired(now)]
+
+    futures = []
+    if len(pending) == 1:
+        results[pending[0]] = resources[pending[0]].refresh(force)
+    elif pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            futures = [(i, executor.submit(resources[i].refresh, force)) for i in pending]
+
+    # Collect every result before raising, so one failing resource doesn't discard the others
+    error = None
+    for i, future in futures:
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            if error is None:
+                error = e
+            pending.remove(i)
+
+    if callback is not None:
+        for i in pending:
+            callback(i, *results[i])
+
+    if error is not None:
+        raise error
+    return results
+
+
+def _iter_table_rows(source):
+    # Stream the page, yielding the cells of each row in the proxy table and discarding rows once they've been read
+    found = in_table = False
+    # The sites serve UTF-8; declaring it skips encoding detection, which otherwise falls back to latin-1
+    for event, element in etree.iterparse(source, events=('start', 'end'), tag=('table', 'tr'), html=True,
+                                          encoding='utf-8'):
+        if element.tag == 'table':
+            if element.get('id') == 'proxylisttable':
+                found = True
+                in_table = event == 'start'
+            continue
+
+        if event != 'end' or not in_table:
+            continue
+
+        data = [''.join(td.itertext()) for td in element.iterchildren('td')]
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+        # Header rows only contain <th> cells
+        if data:
+            yield data
+
+    if not found:
+        raise InvalidHTMLError()
+
+
+def _parse_table(source, row_handler):
+    return frozenset(row_handler(data) for data in _iter_table_rows(source))
+
+
+def _scrape_table(url, source, spec):
+    response = request_proxy_list(url, stream=True)
+    columns = spec['columns']
+    get_type = spec['type']
+
+    # Globals are bound as defaults so the per-row lookups are local
+    def parse_row(data, proxy=Proxy, cache=_intern, anonymous_labels=_ANONYMOUS_LABELS):
+        host, port, code, country, anonymity, type_cell = columns(data)
+        anonymous = anonymity.lower() in anonymous_labels
+        return proxy(host, port, cache(code.lower()), cache(country.lower()), anonymous, get_type(type_cell), source)
+
+    # Feed the body to the parser as it arrives rather than buffering it first
+    response.raw.decode_content = True
 
     try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            anonymous = data[4].lower() in ('anonymous', 'elite proxy')
-            version = 'https' if data[6].lower() == 'yes' else 'http'
-
-            proxies.add(Proxy(host, port, code, country, anonymous, version, 'anonymous-proxy'))
-
-        return proxies
-    except (AttributeError, KeyError):
+        return _parse_table(response.raw, parse_row)
+    except (IndexError, etree.LxmlError):
         raise InvalidHTMLError()
+    except (requests.RequestException, TransportError):
+        # The body is read while parsing, so connection failures surface here rather than in request_proxy_list
+        raise RequestFailedError()
+    finally:
+        response.close()
+
+
+def get_anonymous_proxies():
+    url = 'https://free-proxy-list.net/anonymous-proxy.html'
+    return _scrape_table(url, 'anonymous-proxy', _TABLE_SPECS['anonymous-proxy'])
 
 
 def get_free_proxy_list_proxies():
     url = 'http://www.free-proxy-list.net'
-    response = request_proxy_list(url)
+    return _scrape_table(url, 'free-proxy-list', _TABLE_SPECS['free-proxy-list'])
 
-    try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            anonymous = data[4].lower() in ('anonymous', 'elite proxy')
-            version = 'https' if data[6].lower() == 'yes' else 'http'
-
-            proxies.add(Proxy(host, port, code, country, anonymous, version, 'free-proxy-list'))
-
-        return proxies
-    except (AttributeError, KeyError):
-        raise InvalidHTMLError()
 
+def _get_proxy_daily_sections(text):
+    # Each list runs from its heading up to the next one; the last runs to the end of the page
+    offsets = [text.index(heading) for heading in _PROXY_DAILY_HEADINGS]
+    offsets.append(len(text))
+    return [text[offsets[i]:offsets[i + 1]] for i in range(len(_PROXY_DAILY_HEADINGS))]
 
-def _get_proxy_daily_proxies_parse_inner(element, type, source):
-    content = element.find('div').text
-    rows = content.replace('"', '').replace("'", '').split('\n')
 
-    proxies = set()
+def _split_host_port(rows):
     for row in rows:
-        row = row.strip()
-        if len(row) == 0:
-            continue
+        row = row.decode('ascii')
+        index = row.rfind(':')
+        yield row[:index], row[index + 1:]
+
 
-        params = row.split(':')
-        params.extend([None, None, None, type, source])
-        proxies.add(Proxy(*params))
-    return proxies
+def _get_proxy_daily_proxies_parse_inner(section, type, source):
+    rows = _split_host_port(_IP_PORT_RE.findall(section))
+    return frozenset(Proxy(host, port, None, None, None, type, source) for host, port in rows)
 
 
 def get_proxy_daily_http_proxies():
@@ -162,11 +335,9 @@ def get_proxy_daily_http_proxies():
     response = request_proxy_list(url)
 
     try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content = soup.find('div', {'id': 'free-proxy-list'})
-        centers = content.find_all('center')
-        return _get_proxy_daily_proxies_parse_inner(centers[0], 'http', 'proxy-daily-http')
-    except (AttributeError, KeyError):
+        sections = _get_proxy_daily_sections(response.content)
+        return _get_proxy_daily_proxies_parse_inner(sections[0], 'http', 'proxy-daily-http')
+    except ValueError:
         raise InvalidHTMLError()
 
 
@@ -175,11 +346,9 @@ def get_proxy_daily_socks4_proxies():
     response = request_proxy_list(url)
 
     try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content = soup.find('div', {'id': 'free-proxy-list'})
-        centers = content.find_all('center')
-        return _get_proxy_daily_proxies_parse_inner(centers[1], 'socks4', 'proxy-daily-socks4')
-    except (AttributeError, KeyError):
+        sections = _get_proxy_daily_sections(response.content)
+        return _get_proxy_daily_proxies_parse_inner(sections[1], 'socks4', 'proxy-daily-socks4')
+    except ValueError:
         raise InvalidHTMLError()
 
 
@@ -188,111 +357,30 @@ def get_proxy_daily_socks5_proxies():
     response = request_proxy_list(url)
 
     try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content = soup.find('div', {'id': 'free-proxy-list'})
-        centers = content.find_all('center')
-        return _get_proxy_daily_proxies_parse_inner(centers[2], 'socks5', 'proxy-daily-socks5')
-    except (AttributeError, KeyError):
+        sections = _get_proxy_daily_sections(response.content)
+        return _get_proxy_daily_proxies_parse_inner(sections[2], 'socks5', 'proxy-daily-socks5')
+    except ValueError:
         raise InvalidHTMLError()
 
 
 def get_socks_proxies():
     url = 'https://www.socks-proxy.net'
-    response = request_proxy_list(url)
-
-    try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            version = data[4].lower()
-            anonymous = data[5].lower() in ('anonymous', 'elite proxy')
-
-            proxies.add(Proxy(host, port, code, country, anonymous, version, 'socks-proxy'))
-
-        return proxies
-    except (AttributeError, KeyError):
-        raise InvalidHTMLError()
+    return _scrape_table(url, 'socks-proxy', _TABLE_SPECS['socks-proxy'])
 
 
 def get_ssl_proxies():
     url = 'https://www.sslproxies.org/'
-    response = request_proxy_list(url)
-
-    try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            anonymous = data[4].lower() in ('anonymous', 'elite proxy')
-
-            proxies.add(Proxy(host, port, code, country, anonymous, 'https', 'ssl-proxy'))
-
-        return proxies
-    except (AttributeError, KeyError):
-        raise InvalidHTMLError()
+    return _scrape_table(url, 'ssl-proxy', _TABLE_SPECS['ssl-proxy'])
 
 
 def get_uk_proxies():
     url = 'https://free-proxy-list.net/uk-proxy.html'
-    response = request_proxy_list(url)
-
-    try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            anonymous = data[4].lower() in ('anonymous', 'elite proxy')
-            version = 'https' if data[6].lower() == 'yes' else 'http'
-
-            proxies.add(Proxy(host, port, code, country, anonymous, version, 'uk-proxy'))
-
-        return proxies
-    except (AttributeError, KeyError):
-        raise InvalidHTMLError()
+    return _scrape_table(url, 'uk-proxy', _TABLE_SPECS['uk-proxy'])
 
 
 def get_us_proxies():
     url = 'https://www.us-proxy.org'
-    response = request_proxy_list(url)
-
-    try:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        table = soup.find('table', {'id': 'proxylisttable'})
-        proxies = set()
-
-        for row in table.find('tbody').find_all('tr'):
-            data = list(map(lambda x: x.text, row.find_all('td')))
-            host = data[0]
-            port = data[1]
-            code = data[2].lower()
-            country = data[3].lower()
-            anonymous = data[4].lower() in ('anonymous', 'elite proxy')
-            version = 'https' if data[6].lower() == 'yes' else 'http'
-
-            proxies.add(Proxy(host, port, code, country, anonymous, version, 'us-proxy'))
-
-        return proxies
-    except (AttributeError, KeyError):
-        raise InvalidHTMLError()
+    return _scrape_table(url, 'us-proxy', _TABLE_SPECS['us-proxy'])
 
 
 def add_resource(name, func, resource_types=None):
@@ -331,9 +419,12 @@ def add_resource(name, func, resource_types=None):
 
         RESOURCE_MAP[name] = func
 
-        if resource_types is not None:
-            for resource_type in resource_types:
-                RESOURCE_TYPE_MAP[resource_type].add(name)
+        with _resource_type_lock:
+            if resource_types is not None:
+                for resource_type in resource_types:
+                    RESOURCE_TYPE_MAP[resource_type] = RESOURCE_TYPE_MAP[resource_type].union({name, })
+
+            RESOURCE_TO_TYPES_MAP[name] = frozenset(resource_types or ())
 
 
 def add_resource_type(name, resources=None):
@@ -363,16 +454,19 @@ def add_resource_type(name, resources=None):
         if resources is not None:
             if not is_iterable(resources):
                 resources = {resources, }
-            resources = set(resources)
+            resources = frozenset(resources)
 
             for resource in resources:
                 if resource not in RESOURCE_MAP:
                     raise InvalidResourceError('{} is an invalid resource'.format(resource))
         else:
-            resources = set()
+            resources = frozenset()
 
         RESOURCE_TYPE_MAP[name] = resources
 
+        for resource in resources:
+            RESOURCE_TO_TYPES_MAP[resource] = RESOURCE_TO_TYPES_MAP.get(resource, frozenset()).union({name, })
+
 
 def get_resource_types():
     """Returns a set of the resource types.
@@ -407,26 +501,32 @@ RESOURCE_MAP = {
 }
 
 RESOURCE_TYPE_MAP = {
-    'http': {
+    'http': frozenset({
         'us-proxy',
         'uk-proxy',
         'free-proxy-list',
         'proxy-daily-http',
         'anonymous-proxy'
-    },
-    'https': {
+    }),
+    'https': frozenset({
         'us-proxy',
         'uk-proxy',
         'free-proxy-list',
         'ssl-proxy',
         'anonymous-proxy'
-    },
-    'socks4': {
+    }),
+    'socks4': frozenset({
         'socks-proxy',
         'proxy-daily-socks4'
-    },
-    'socks5': {
+    }),
+    'socks5': frozenset({
         'socks-proxy',
         'proxy-daily-socks5'
-    }
+    })
+}
+
+# The inverse of RESOURCE_TYPE_MAP, mapping each resource to the resource types it belongs to
+RESOURCE_TO_TYPES_MAP = {
+    resource: frozenset(resource_type for resource_type, names in RESOURCE_TYPE_MAP.items() if resource in names)
+    for resource in RESOURCE_MAP
 }
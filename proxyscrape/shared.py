@@ -21,29 +21,95 @@
 # SOFTWARE.
 
 
-__all__ = ['is_iterable', 'Proxy', 'request_proxy_list']
+__all__ = ['conditional_requests', 'is_iterable', 'Proxy', 'request_proxy_list']
 
 
 from collections import namedtuple
+from contextlib import contextmanager
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .errors import (
     RequestFailedError,
+    RequestNotModifiedError,
     RequestNotOKError
 )
 
+# A namedtuple rather than a class: proxies are created and hashed for every scraped row, and are indexed as
+# (host, port) tuples when blacklisting
 Proxy = namedtuple('Proxy', ['host', 'port', 'code', 'country', 'anonymous', 'type', 'source'])
 
+# A shared session keeps connections to each site alive between refreshes
+_SESSION = requests.Session()
+_SESSION.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_SESSION.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_SESSION.headers['Accept-Encoding'] = 'gzip, deflate'
 
-def request_proxy_list(url):
+# (connect, read) timeouts in seconds
+_TIMEOUT = (3.05, 15)
+
+
+# Holds the validators of the conditional requests active on each thread
+_local = threading.local()
+
+
+@contextmanager
+def conditional_requests(validators):
+    """Makes proxy list requests on this thread conditional on the given validators.
+
+    Requests to a url found in `validators` send its headers, and raise `RequestNotModifiedError` if the server responds
+    that the content is unchanged. Successful responses record their `ETag` and `Last-Modified` into `validators`.
+
+    A single unchanged url aborts the whole refresh, so this only suits resources whose proxies come from one request; a
+    resource that fetches several urls would otherwise lose the proxies of the urls that did change.
+
+    :param validators:
+        The conditional request headers to send, keyed by url.
+    :type validators: dict
+    """
+    previous = getattr(_local, 'validators', None)
+    _local.validators = validators
     try:
-        response = requests.get(url)
+        yield validators
+    finally:
+        _local.validators = previous
+
+
+def request_proxy_list(url, stream=False):
+    validators = getattr(_local, 'validators', None)
+    headers = validators.get(url) if validators is not None else None
+
+    try:
+        response = _SESSION.get(url, headers=headers, stream=stream, timeout=_TIMEOUT)
     except requests.RequestException:
         raise RequestFailedError()
 
+    if response.status_code == 304:
+        response.close()
+        raise RequestNotModifiedError()
+
     if not response.ok:
+        response.close()
         raise RequestNotOKError()
+
+    if validators is not None:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        if headers:
+            validators[url] = headers
+        else:
+            validators.pop(url, None)
+
+    # Avoid charset detection when the body is read as text
+    response.encoding = 'utf-8'
     return response
 
 
@@ -41,7 +41,12 @@ setup(
     include_package_data=True,
     test_suite='tests',
     install_requires=[
-        'BeautifulSoup4',
+        'futures; python_version < "3"',
+        'lxml',
         'requests',
-    ]
+        'urllib3',
+    ],
+    extras_require={
+        're2': ['google-re2'],
+    }
 )
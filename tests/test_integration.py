@@ -42,8 +42,8 @@ RESOURCE_MAP_COPY = pss.RESOURCE_MAP.copy()
 
 class TestIntegrationProxyScrape(unittest.TestCase):
     def setUp(self):
-        self.requests_patcher = patch('proxyscrape.shared.requests')
-        self.requests = self.requests_patcher.start()
+        self.session_patcher = patch('proxyscrape.shared._SESSION')
+        self.session = self.session_patcher.start()
 
         # Revert constants to defaults before each test
         pss.RESOURCE_MAP = RESOURCE_MAP_COPY.copy()
@@ -83,7 +83,7 @@ class TestIntegrationProxyScrape(unittest.TestCase):
             response = Mock()
             response.text = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             resource_name = get_proxyscrape_resource()
 
@@ -104,7 +104,7 @@ class TestIntegrationProxyScrape(unittest.TestCase):
     def test_proxyscrape_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         resource_name = get_proxyscrape_resource()
         func = pss.RESOURCE_MAP[resource_name]
@@ -120,7 +120,7 @@ class TestIntegrationProxyScrape(unittest.TestCase):
             response = Mock()
             response.text = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             resource_name = get_proxyscrape_resource()
             func = pss.RESOURCE_MAP[resource_name]
@@ -452,6 +452,28 @@ class TestCollector(unittest.TestCase):
             store_mock.update_store.assert_called_with(attrs['id'], proxies)
 
 
+    def test_refresh_proxies_updates_store_before_raising(self):
+        proxies = {Proxy('host', 'port', 'code', 'country', 'anonymous', 'type', 'source'), }
+        store_mock = Mock()
+        store_mock.return_value = store_mock  # Ensure same instance when initialized
+        failing_resource = Mock()
+        failing_resource.refresh.side_effect = TypeError('bug')
+        working_resource = Mock()
+        working_resource.refresh.return_value = True, proxies
+        proxy_resource_mock = Mock(side_effect=[failing_resource, working_resource])
+
+        ps.Store = store_mock
+        ps.ProxyResource = proxy_resource_mock
+
+        collector = ps.Collector(None, 10, ('uk-proxy', 'us-proxy'))
+
+        with self.assertRaises(TypeError):
+            collector.refresh_proxies(False)
+
+        self.assertEqual(1, store_mock.update_store.call_count)
+        self.assertEqual(proxies, store_mock.update_store.call_args[0][1])
+
+
 if __name__ == '__main__':
     unittest.main()
     cwd = os.getcwd()
@@ -20,18 +20,23 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from io import BytesIO
 import os
 import time
-from threading import Thread
+from threading import Event, Thread
 import unittest
 try:
     from unittest.mock import Mock, patch
 except ImportError:
     from mock import Mock, patch
 
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
 from proxyscrape.errors import (
     InvalidResourceError,
     InvalidResourceTypeError,
+    RequestNotModifiedError,
     ResourceAlreadyDefinedError,
     ResourceTypeAlreadyDefinedError
 )
@@ -40,6 +45,7 @@ from proxyscrape.scrapers import (
     add_resource_type,
     get_resources,
     get_resource_types,
+    refresh_all,
     _resource_lock,
     _resource_type_lock,
     ProxyResource,
@@ -50,6 +56,7 @@ from proxyscrape.shared import Proxy
 
 RESOURCE_MAP_COPY = pss.RESOURCE_MAP.copy()
 RESOURCE_TYPE_MAP_COPY = {k: v.copy() for k, v in pss.RESOURCE_TYPE_MAP.items()}
+RESOURCE_TO_TYPES_MAP_COPY = pss.RESOURCE_TO_TYPES_MAP.copy()
 
 
 def hold_lock(lock, hold_time, func):
@@ -117,9 +124,7 @@ class TestProxyResource(unittest.TestCase):
 
     def test_doesnt_refresh_if_lock_check(self):
         expected = [Proxy('host', 'port', 'code', 'country', 'anonymous', 'type', 'source')]
-
-        def func():
-            return expected
+        func = Mock(return_value=expected)
 
         pr = ProxyResource(func, 5)
 
@@ -127,30 +132,181 @@ class TestProxyResource(unittest.TestCase):
         self.assertEqual(True, refreshed)
         self.assertEqual(expected[0], actual[0])
 
-        with patch('proxyscrape.scrapers.time') as time_mock:
-            times = [time.time() + 10, -1, 0]
-            time_iter = iter(times)
-            time_mock.time = lambda: next(time_iter)
+        lock = pr._lock
+
+        def acquire(blocking=True):
+            # Another refresh completes while waiting on the lock
+            pr._last_refresh_time = pss._monotonic() + 10
+            return lock.acquire(blocking)
+
+        pr._lock = Mock(acquire=acquire, release=lock.release)
+        pr._last_refresh_time = pss._monotonic() - 10
+
+        refreshed, actual = pr.refresh()
+        self.assertEqual(False, refreshed)
+        self.assertIsNone(actual)
+        self.assertEqual(1, func.call_count)
+
+    def test_doesnt_refresh_if_refresh_in_progress(self):
+        func = Mock(return_value=set())
+        pr = ProxyResource(func, 5)
+
+        with pr._lock:
+            refreshed, actual = pr.refresh(True)
+
+        self.assertEqual(False, refreshed)
+        self.assertIsNone(actual)
+        func.assert_not_called()
+
+    def test_refreshes_initially_regardless_of_clock(self):
+        pr = ProxyResource(lambda: set(), 3600)
 
+        with patch('proxyscrape.scrapers._monotonic', return_value=1):
             refreshed, actual = pr.refresh()
+
+        self.assertEqual(True, refreshed)
+        self.assertEqual(set(), actual)
+
+    def test_returns_previous_proxies_if_not_modified(self):
+        expected = {Proxy('host', 'port', 'code', 'country', 'anonymous', 'type', 'source')}
+        func = Mock(side_effect=[expected, RequestNotModifiedError()])
+
+        pr = ProxyResource(func, 5)
+        pr.refresh()
+
+        refreshed, actual = pr.refresh(True)
+        self.assertEqual(True, refreshed)
+        self.assertEqual(expected, actual)
+
+    def test_doesnt_refresh_if_wall_clock_changes(self):
+        func = Mock(return_value=set())
+        pr = ProxyResource(func, 5)
+
+        # The monotonic clock stands still while the wall clock jumps ahead
+        with patch('proxyscrape.scrapers._monotonic', return_value=100):
+            pr.refresh()
+
+            with patch('time.time', return_value=time.time() + 3600):
+                refreshed, actual = pr.refresh()
+
+        self.assertEqual(False, refreshed)
+        self.assertIsNone(actual)
+        self.assertEqual(1, func.call_count)
+
+    def test_samples_clock_once_before_and_once_after_fetch(self):
+        pr = ProxyResource(lambda: set(), 5)
+
+        with patch('proxyscrape.scrapers._monotonic', side_effect=[100, 101, 102]) as clock:
+            pr.refresh()
+            self.assertEqual(2, clock.call_count)
+            self.assertEqual(101, pr._last_refresh_time)
+
+            refreshed, _ = pr.refresh()
             self.assertEqual(False, refreshed)
-            self.assertIsNone(actual)
+            self.assertEqual(3, clock.call_count)
+
+
+class TestRefreshAll(unittest.TestCase):
+    def test_returns_results_in_order(self):
+        expected = [Proxy('host' + str(i), 'port', 'code', 'country', 'anonymous', 'type', 'source') for i in range(4)]
+        resources = [ProxyResource(lambda p=p: {p, }, 5) for p in expected]
+
+        results = refresh_all(resources)
+
+        self.assertEqual([(True, {p, }) for p in expected], results)
+
+    def test_passes_force(self):
+        pr = ProxyResource(lambda: set(), 5)
+        pr.refresh()
+
+        self.assertEqual([(False, None)], refresh_all([pr]))
+        self.assertEqual([(True, set())], refresh_all([pr], force=True))
+
+    def test_refreshes_concurrently(self):
+        event = Event()
+
+        def wait():
+            if not event.wait(1):
+                raise AssertionError('resources were not refreshed concurrently')
+            return set()
+
+        def notify():
+            event.set()
+            return set()
+
+        results = refresh_all([ProxyResource(wait, 5), ProxyResource(notify, 5)])
+
+        self.assertEqual([(True, set()), (True, set())], results)
+
+    def test_empty(self):
+        self.assertEqual([], refresh_all([]))
+
+    def test_doesnt_start_threads_if_none_expired(self):
+        resources = [ProxyResource(lambda: set(), 5) for _ in range(3)]
+        for resource in resources:
+            resource.refresh()
+
+        with patch('proxyscrape.scrapers.ThreadPoolExecutor') as executor:
+            results = refresh_all(resources)
+
+        self.assertEqual([(False, None)] * 3, results)
+        executor.assert_not_called()
+
+    def test_only_refreshes_expired(self):
+        fresh = ProxyResource(Mock(return_value=set()), 5)
+        fresh.refresh()
+        expired = ProxyResource(lambda: set(), 5)
+
+        results = refresh_all([fresh, expired])
+
+        self.assertEqual([(False, None), (True, set())], results)
+        self.assertEqual(1, fresh._func.call_count)
+
+    def test_keeps_results_if_a_refresh_raises(self):
+        def fail():
+            raise TypeError('bug')
+
+        expected = {Proxy('host', 'port', 'code', 'country', 'anonymous', 'type', 'source')}
+        good = ProxyResource(lambda: expected, 5)
+        callback = Mock()
+
+        with self.assertRaises(TypeError):
+            refresh_all([ProxyResource(fail, 5), good], callback=callback)
+
+        callback.assert_called_once_with(1, True, expected)
+        self.assertFalse(good.is_expired())
+
+    def test_raises_if_single_refresh_raises(self):
+        def fail():
+            raise TypeError('bug')
+
+        with self.assertRaises(TypeError):
+            refresh_all([ProxyResource(fail, 5)])
+
+    def test_callback_receives_refreshed_results(self):
+        fresh = ProxyResource(lambda: set(), 5)
+        fresh.refresh()
+        callback = Mock()
+
+        refresh_all([fresh, ProxyResource(lambda: set(), 5)], callback=callback)
+
+        callback.assert_called_once_with(1, True, set())
 
 
 class TestScrapers(unittest.TestCase):
     def setUp(self):
-        self.requests_patcher = patch('proxyscrape.shared.requests')
-        self.requests = self.requests_patcher.start()
+        self.session_patcher = patch('proxyscrape.shared._SESSION')
+        self.session = self.session_patcher.start()
 
     def tearDown(self):
-        self.requests_patcher.stop()
+        self.session_patcher.stop()
 
     def test_anonymous_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'anonymous-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'anonymous-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'br', 'brazil', True, 'https', 'anonymous-proxy'),
@@ -169,7 +325,7 @@ class TestScrapers(unittest.TestCase):
     def test_anonymous_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['anonymous-proxy']
         pr = ProxyResource(func, 10)
@@ -180,11 +336,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_anonymous_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['anonymous-proxy']
         pr = ProxyResource(func, 10)
@@ -195,11 +350,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_anonymous_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['anonymous-proxy']
             pr = ProxyResource(func, 10)
@@ -210,11 +365,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_free_proxy_list_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'free-proxy-list-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'free-proxy-list-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'br', 'brazil', True, 'https', 'free-proxy-list'),
@@ -233,7 +388,7 @@ class TestScrapers(unittest.TestCase):
     def test_free_proxy_list_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['free-proxy-list']
         pr = ProxyResource(func, 10)
@@ -244,11 +399,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_free_proxy_list_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['free-proxy-list']
         pr = ProxyResource(func, 10)
@@ -259,11 +413,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_free_proxy_list_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['free-proxy-list']
             pr = ProxyResource(func, 10)
@@ -274,11 +428,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_proxy_daily_http_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('93.190.253.50', '80', None, None, None, 'http', 'proxy-daily-http'),
@@ -297,7 +451,7 @@ class TestScrapers(unittest.TestCase):
     def test_proxy_daily_http_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['proxy-daily-http']
         pr = ProxyResource(func, 10)
@@ -308,11 +462,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_http_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['proxy-daily-http']
         pr = ProxyResource(func, 10)
@@ -323,11 +476,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_http_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['proxy-daily-http']
             pr = ProxyResource(func, 10)
@@ -338,11 +491,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_proxy_daily_socks4_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('54.38.156.185', '8888', None, None, None, 'socks4', 'proxy-daily-socks4'),
@@ -361,7 +514,7 @@ class TestScrapers(unittest.TestCase):
     def test_proxy_daily_socks4_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['proxy-daily-socks4']
         pr = ProxyResource(func, 10)
@@ -372,11 +525,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_socks4_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['proxy-daily-socks4']
         pr = ProxyResource(func, 10)
@@ -387,11 +539,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_socks4_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['proxy-daily-socks4']
             pr = ProxyResource(func, 10)
@@ -402,11 +554,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_proxy_daily_socks5_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'proxy-daily-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('176.9.19.170', '1080', None, None, None, 'socks5', 'proxy-daily-socks5'),
@@ -425,7 +577,7 @@ class TestScrapers(unittest.TestCase):
     def test_proxy_daily_socks5_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['proxy-daily-socks5']
         pr = ProxyResource(func, 10)
@@ -436,11 +588,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_socks5_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['proxy-daily-socks5']
         pr = ProxyResource(func, 10)
@@ -451,11 +602,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_proxy_daily_socks5_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.content = html.read()
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['proxy-daily-socks5']
             pr = ProxyResource(func, 10)
@@ -466,11 +617,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_socks_proxy_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'socks-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'socks-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'br', 'brazil', True, 'socks4', 'socks-proxy'),
@@ -489,7 +640,7 @@ class TestScrapers(unittest.TestCase):
     def test_socks_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['socks-proxy']
         pr = ProxyResource(func, 10)
@@ -500,11 +651,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_socks_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['socks-proxy']
         pr = ProxyResource(func, 10)
@@ -515,11 +665,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_socks_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['socks-proxy']
             pr = ProxyResource(func, 10)
@@ -530,11 +680,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_ssl_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'ssl-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'ssl-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'br', 'brazil', True, 'https', 'ssl-proxy'),
@@ -553,7 +703,7 @@ class TestScrapers(unittest.TestCase):
     def test_ssl_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['ssl-proxy']
         pr = ProxyResource(func, 10)
@@ -564,11 +714,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_ssl_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['ssl-proxy']
         pr = ProxyResource(func, 10)
@@ -579,11 +728,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_ssl_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['ssl-proxy']
             pr = ProxyResource(func, 10)
@@ -594,11 +743,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_uk_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'uk-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'uk-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'uk', 'united kingdom', True, 'https', 'uk-proxy'),
@@ -617,7 +766,7 @@ class TestScrapers(unittest.TestCase):
     def test_uk_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['uk-proxy']
         pr = ProxyResource(func, 10)
@@ -628,11 +777,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_uk_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['uk-proxy']
         pr = ProxyResource(func, 10)
@@ -643,11 +791,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_uk_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['uk-proxy']
             pr = ProxyResource(func, 10)
@@ -658,11 +806,11 @@ class TestScrapers(unittest.TestCase):
             self.assertIsNone(proxies)
 
     def test_us_proxies_success(self):
-        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             expected = {
                 Proxy('179.124.59.232', '53281', 'us', 'united states', True, 'https', 'us-proxy'),
@@ -681,7 +829,7 @@ class TestScrapers(unittest.TestCase):
     def test_us_proxies_not_ok(self):
         response = Mock()
         response.ok = False
-        self.requests.get = lambda url: response
+        self.session.get = lambda url, **kwargs: response
 
         func = RESOURCE_MAP['us-proxy']
         pr = ProxyResource(func, 10)
@@ -692,11 +840,10 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_us_proxies_request_exception(self):
-        def raise_exception(url):
-            raise self.requests.RequestException()
+        def raise_exception(url, **kwargs):
+            raise requests.RequestException()
 
-        self.requests.RequestException = Exception
-        self.requests.get = raise_exception
+        self.session.get = raise_exception
 
         func = RESOURCE_MAP['us-proxy']
         pr = ProxyResource(func, 10)
@@ -707,11 +854,11 @@ class TestScrapers(unittest.TestCase):
         self.assertIsNone(proxies)
 
     def test_us_proxies_invalid_html(self):
-        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'r') as html:
+        with open(os.path.join(cwd, 'mock_pages', 'empty.html'), 'rb') as html:
             response = Mock()
-            response.content = html
+            response.raw = BytesIO(html.read())
             response.ok = True
-            self.requests.get = lambda url: response
+            self.session.get = lambda url, **kwargs: response
 
             func = RESOURCE_MAP['us-proxy']
             pr = ProxyResource(func, 10)
@@ -721,12 +868,157 @@ class TestScrapers(unittest.TestCase):
             self.assertEqual(False, refreshed)
             self.assertIsNone(proxies)
 
+    def test_table_proxies_streamed_and_closed(self):
+        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'rb') as html:
+            response = Mock()
+            response.raw = BytesIO(html.read())
+            response.ok = True
+            self.session.get.return_value = response
+
+            func = RESOURCE_MAP['us-proxy']
+            pr = ProxyResource(func, 10)
+
+            refreshed, _ = pr.refresh()
+
+            self.assertEqual(True, refreshed)
+            self.assertEqual(True, self.session.get.call_args[1]['stream'])
+            self.assertEqual(True, response.raw.decode_content)
+            response.close.assert_called_once_with()
+
+    def test_table_proxies_read_failure(self):
+        class FailingBody(BytesIO):
+            def read(self, size=-1):
+                # Fail partway through the body
+                if self.tell() > 0:
+                    raise ReadTimeoutError(None, None, 'Read timed out.')
+                return BytesIO.read(self, 64)
+
+        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'rb') as html:
+            body = FailingBody(html.read())
+
+        response = Mock()
+        response.raw = body
+        response.ok = True
+        self.session.get = lambda url, **kwargs: response
+
+        func = RESOURCE_MAP['us-proxy']
+        pr = ProxyResource(func, 10)
+
+        refreshed, proxies = pr.refresh()
+
+        self.assertEqual(False, refreshed)
+        self.assertIsNone(proxies)
+        response.close.assert_called_once_with()
+
+    def test_table_proxies_conditional_request(self):
+        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'rb') as html:
+            response = Mock()
+            response.raw = BytesIO(html.read())
+            response.ok = True
+            response.status_code = 200
+            response.headers = {'ETag': '"etag"', 'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT'}
+            not_modified = Mock()
+            not_modified.status_code = 304
+            self.session.get.side_effect = [response, not_modified]
+
+            func = RESOURCE_MAP['us-proxy']
+            pr = ProxyResource(func, 10)
+
+            _, expected = pr.refresh()
+            refreshed, proxies = pr.refresh(True)
+
+            self.assertIsNone(self.session.get.call_args_list[0][1]['headers'])
+            self.assertEqual({'If-None-Match': '"etag"', 'If-Modified-Since': 'Mon, 01 Jan 2018 00:00:00 GMT'},
+                             self.session.get.call_args_list[1][1]['headers'])
+            self.assertEqual(True, refreshed)
+            self.assertEqual(expected, proxies)
+
+    def test_table_proxies_unconditional_request_without_validators(self):
+        with open(os.path.join(cwd, 'mock_pages', 'us-proxy.html'), 'rb') as html:
+            content = html.read()
+
+        def get(url, **kwargs):
+            response = Mock()
+            response.raw = BytesIO(content)
+            response.ok = True
+            response.status_code = 200
+            response.headers = {}
+            return response
+
+        self.session.get.side_effect = get
+
+        func = RESOURCE_MAP['us-proxy']
+        pr = ProxyResource(func, 10)
+
+        pr.refresh()
+        refreshed, _ = pr.refresh(True)
+
+        self.assertIsNone(self.session.get.call_args_list[1][1]['headers'])
+        self.assertEqual(True, refreshed)
+
+    def test_table_proxies_decoded_as_utf8(self):
+        html = u"""
+            <table id="proxylisttable">
+                <tbody>
+                    <tr>
+                        <td>179.124.59.232</td>
+                        <td>53281</td>
+                        <td>CW</td>
+                        <td>Cura\u00e7ao</td>
+                        <td>anonymous</td>
+                        <td>no</td>
+                        <td>no</td>
+                        <td>1 minute ago</td>
+                    </tr>
+                </tbody>
+            </table>
+        """
+        response = Mock()
+        response.raw = BytesIO(html.encode('utf-8'))
+        response.ok = True
+        self.session.get = lambda url, **kwargs: response
+
+        func = RESOURCE_MAP['us-proxy']
+        pr = ProxyResource(func, 10)
+
+        _, proxies = pr.refresh()
+
+        self.assertEqual({Proxy('179.124.59.232', '53281', 'cw', u'cura\u00e7ao', True, 'http', 'us-proxy')}, proxies)
+
+    def test_ssl_proxies_only_read_first_five_columns(self):
+        html = b"""
+            <table id="proxylisttable">
+                <tbody>
+                    <tr>
+                        <td>179.124.59.232</td>
+                        <td>53281</td>
+                        <td>BR</td>
+                        <td>Brazil</td>
+                        <td>elite proxy</td>
+                    </tr>
+                </tbody>
+            </table>
+        """
+        response = Mock()
+        response.raw = BytesIO(html)
+        response.ok = True
+        self.session.get = lambda url, **kwargs: response
+
+        func = RESOURCE_MAP['ssl-proxy']
+        pr = ProxyResource(func, 10)
+
+        refreshed, proxies = pr.refresh()
+
+        self.assertEqual(True, refreshed)
+        self.assertEqual({Proxy('179.124.59.232', '53281', 'br', 'brazil', True, 'https', 'ssl-proxy')}, proxies)
+
 
 class TestResource(unittest.TestCase):
     def setUp(self):
         # Revert constants to defaults before each test
         pss.RESOURCE_MAP = RESOURCE_MAP_COPY.copy()
         pss.RESOURCE_TYPE_MAP = {k: v.copy() for k, v in RESOURCE_TYPE_MAP_COPY.items()}
+        pss.RESOURCE_TO_TYPES_MAP = RESOURCE_TO_TYPES_MAP_COPY.copy()
         self.resource_name = get_random_resource_name(self)
         self.resource_type_name = get_random_resource_type_name(self)
 
@@ -767,6 +1059,20 @@ class TestResource(unittest.TestCase):
         add_resource(self.resource_name, lambda: set(), None)
         self.assertIn(self.resource_name, pss.RESOURCE_MAP)
 
+    def test_add_resource_updates_resource_to_types_map(self):
+        add_resource(self.resource_name, lambda: set(), ['http', 'socks4'])
+        self.assertSetEqual({'http', 'socks4'}, pss.RESOURCE_TO_TYPES_MAP[self.resource_name])
+
+    def test_add_resource_type_updates_resource_to_types_map(self):
+        add_resource_type(self.resource_type_name, ('us-proxy', 'uk-proxy'))
+        self.assertSetEqual({'http', 'https', self.resource_type_name}, pss.RESOURCE_TO_TYPES_MAP['us-proxy'])
+        self.assertSetEqual({'http', 'https', self.resource_type_name}, pss.RESOURCE_TO_TYPES_MAP['uk-proxy'])
+
+    def test_resource_to_types_map_is_inverse_of_resource_type_map(self):
+        for resource, resource_types in pss.RESOURCE_TO_TYPES_MAP.items():
+            for resource_type, resources in pss.RESOURCE_TYPE_MAP.items():
+                self.assertEqual(resource_type in resource_types, resource in resources)
+
     def test_add_resource_type_exception_if_duplicate(self):
         add_resource_type(self.resource_type_name)
 